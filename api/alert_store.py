@@ -0,0 +1,263 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("AIOps-API")
+
+# Alert DB Configuration
+ALERT_DB_PATH = os.getenv("AIOPS_ALERT_DB", "api/alerts.db")
+ALERT_RETENTION_DAYS = float(os.getenv("AIOPS_ALERT_RETENTION_DAYS", "90"))
+
+COLUMNS = [
+    'detected_at', 'event_timestamp', 'source_ip', 'dest_ip', 'dest_port', 'dest_domain',
+    'protocol', 'process_path', 'process_hash', 'parent_process', 'user_context',
+    'bytes_sent', 'bytes_recv', 'anomaly_score'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    detected_at REAL NOT NULL,
+    event_timestamp TEXT,
+    source_ip TEXT,
+    dest_ip TEXT,
+    dest_port INTEGER,
+    dest_domain TEXT,
+    protocol TEXT,
+    process_path TEXT,
+    process_hash TEXT,
+    parent_process TEXT,
+    user_context TEXT,
+    bytes_sent INTEGER,
+    bytes_recv INTEGER,
+    anomaly_score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_time ON alerts (detected_at, id);
+CREATE INDEX IF NOT EXISTS idx_alerts_source ON alerts (source_ip, detected_at, id);
+CREATE INDEX IF NOT EXISTS idx_alerts_dest ON alerts (dest_ip, dest_port, detected_at, id);
+-- dest_port on its own (e.g. every alert to a C2 port) can't use idx_alerts_dest
+CREATE INDEX IF NOT EXISTS idx_alerts_port ON alerts (dest_port, detected_at, id);
+CREATE INDEX IF NOT EXISTS idx_alerts_hash ON alerts (process_hash, detected_at, id);
+"""
+
+class AlertStore:
+    """Append-optimized SQLite (WAL) store for anomaly alerts.
+
+    Writes are queued by the request path and flushed in batches by a single
+    writer thread. Old alerts are deleted periodically so the indexes stay small.
+    """
+
+    def __init__(self, db_path=ALERT_DB_PATH, retention_days=ALERT_RETENTION_DAYS,
+                 batch_size=500, flush_interval=1.0, compact_interval=3600, max_queue=100000):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._last_compaction = 0.0
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.compacted = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        # Must be set before WAL is enabled and the first table is created to take effect
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._writer = threading.Thread(target=self._run, name="alert-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Alert store started at {self.db_path} (retention: {self.retention_days} days)")
+
+    @property
+    def running(self):
+        return self._writer is not None and self._writer.is_alive()
+
+    def stop(self, timeout=10.0):
+        if self._writer is None:
+            return
+        if self._writer.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.error("Alert queue full at shutdown, unwritten alerts will be lost")
+            self._writer.join(timeout)
+        self._writer = None
+
+    def record(self, alert):
+        """Queue an alert for writing. Never blocks the caller."""
+        if not self.running:
+            # Store is down; the caller's log line is the only record of this alert
+            with self._stats_lock:
+                self.dropped += 1
+            return
+        row = dict(alert)
+        row.setdefault('detected_at', time.time())
+        try:
+            self._queue.put_nowait(tuple(row.get(col) for col in COLUMNS))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            logger.error(f"Alert queue full, dropping alert for {row.get('source_ip')}")
+
+    def flush(self, timeout=None):
+        """Block until every queued alert has been written. Returns False if the writer
+        stopped or the timeout expired first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                if not self.running or (deadline is not None and time.monotonic() >= deadline):
+                    return False
+                self._queue.all_tasks_done.wait(0.1)
+        return True
+
+    def _run(self):
+        conn = self._connect()
+        self.compact(conn)
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.task_done()
+                    running = False
+                    break
+                batch.append(item)
+
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            f"INSERT INTO alerts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                            batch
+                        )
+                    with self._stats_lock:
+                        self.written += len(batch)
+                except sqlite3.Error as e:
+                    with self._stats_lock:
+                        self.dropped += len(batch)
+                    logger.error(f"Failed to write {len(batch)} alerts: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self.compact(conn)
+        conn.close()
+
+    def compact(self, conn=None, now=None):
+        """Delete alerts older than the retention window and reclaim the freed pages."""
+        own_conn = conn is None
+        conn = conn or self._connect()
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        deleted = 0
+        try:
+            # Delete in chunks so readers are never blocked behind one huge transaction
+            while True:
+                with conn:
+                    cur = conn.execute(
+                        "DELETE FROM alerts WHERE id IN "
+                        "(SELECT id FROM alerts WHERE detected_at < ? ORDER BY detected_at LIMIT 10000)",
+                        (cutoff,)
+                    )
+                deleted += cur.rowcount
+                if cur.rowcount < 10000:
+                    break
+            if deleted:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                logger.info(f"Alert store compaction removed {deleted} alerts older than {self.retention_days} days")
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logger.error(f"Alert store compaction failed: {e}")
+        finally:
+            if own_conn:
+                conn.close()
+        with self._stats_lock:
+            self.compacted += deleted
+        self._last_compaction = time.monotonic()
+        return deleted
+
+    def query(self, source_ip=None, dest_ip=None, dest_port=None, process_hash=None,
+              start=None, end=None, limit=100, cursor=None):
+        """Return one page of alerts, newest first, and the cursor for the next page.
+
+        `start`/`end` are epoch seconds. `cursor` is the opaque value returned by the
+        previous page (keyset pagination, so deep pages cost the same as the first).
+        """
+        clauses, params = [], []
+        for col, value in (('source_ip', source_ip), ('dest_ip', dest_ip),
+                           ('dest_port', dest_port), ('process_hash', process_hash)):
+            if value is not None:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("detected_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("detected_at < ?")
+            params.append(end)
+        if cursor:
+            try:
+                cur_time, cur_id = cursor.split(":")
+                cur_time, cur_id = float(cur_time), int(cur_id)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            clauses.append("(detected_at < ? OR (detected_at = ? AND id < ?))")
+            params.extend([cur_time, cur_time, cur_id])
+
+        sql = "SELECT * FROM alerts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY detected_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        # A short-lived connection per query: opening one is cheap next to the query,
+        # and nothing is left open per threadpool worker after shutdown
+        conn = self._connect()
+        try:
+            rows = [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last['detected_at']!r}:{last['id']}"
+        return rows, next_cursor
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "db_path": self.db_path,
+                "retention_days": self.retention_days,
+                "running": self.running,
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "compacted": self.compacted,
+            }
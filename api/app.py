@@ -1,12 +1,19 @@
 import os
-import joblib
-import pandas as pd
 import logging
-from fastapi import FastAPI, HTTPException, Security, status
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Security, status
+from fastapi.responses import JSONResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from api.alert_store import AlertStore
+from api.model_registry import ModelRegistry
+
+# NOTE: pandas, joblib and scikit-learn are imported lazily by the model loader.
+# Importing them here would add over a second to every container start.
 
 # Configure Logging
 logging.basicConfig(
@@ -19,8 +26,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AIOps-API")
 
-app = FastAPI(title="AIOps Network Anomaly Detection API")
-
 # Security Configuration
 API_KEY_NAME = "X-API-Key"
 API_KEY_HEADER = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
@@ -35,18 +40,137 @@ async def get_api_key(api_key_header: str = Security(API_KEY_HEADER)):
     )
 
 # Model Path
-MODEL_PATH = "ml/models/anomaly_model.joblib"
+MODEL_PATH = os.getenv("AIOPS_MODEL_PATH", "ml/models/anomaly_model.joblib")
+
+# Number of synthetic rows pushed through the model before reporting ready
+WARMUP_BATCH_SIZE = 32
+
+NUMERIC_FEATURES = ['dest_port', 'bytes_sent', 'bytes_recv']
+
+class ModelState:
+    """Tracks the background model load so /ready can report progress."""
+
+    def __init__(self):
+        self.status = "pending"  # pending -> loading -> warming -> ready | missing | failed
+        self.artifacts = None
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.path = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def begin_loading(self):
+        """Claim the load. Returns False if a load was already started for this state,
+        so a second startup in the same process (e.g. in tests) can't reset a loaded model."""
+        with self._lock:
+            if self.status != "pending":
+                return False
+            self.status = "loading"
+            return True
+
+    def summary(self):
+        return {
+            "status": self.status,
+            "model_path": self.path,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+model_state = ModelState()
+
+# Anomalies are persisted here (batched, off the request path) in addition to the log
+alert_store = AlertStore()
+
+def preprocess(artifacts, df_input):
+    """Apply the training-time encoding and scaling to a DataFrame of events."""
+    # Handle protocol encoding
+    le = artifacts['le_protocol']
+    # If protocol is unseen, we might need handling, but for this project we assume known protocols
+    try:
+        df_input['protocol_enc'] = le.transform(df_input['protocol'])
+    except ValueError:
+        # Simple fallback for unknown protocol
+        df_input['protocol_enc'] = -1
+
+    # Scale numeric features
+    scaler = artifacts['scaler']
+    df_input[NUMERIC_FEATURES] = scaler.transform(df_input[NUMERIC_FEATURES])
+    return df_input[artifacts['features']]
+
+def warm_up(artifacts, batch_size=WARMUP_BATCH_SIZE):
+    """Run a synthetic batch through the full pipeline so the first real request doesn't pay for lazy sklearn initialization."""
+    import pandas as pd
+
+    protocols = list(artifacts['le_protocol'].classes_)
+    df_warm = pd.DataFrame({
+        'dest_port': [(53, 80, 443, 8080)[i % 4] for i in range(batch_size)],
+        'bytes_sent': [64 * (i + 1) for i in range(batch_size)],
+        'bytes_recv': [128 * (i + 1) for i in range(batch_size)],
+        'protocol': [protocols[i % len(protocols)] for i in range(batch_size)],
+    })
+    X = preprocess(artifacts, df_warm)
+    model = artifacts['model']
+    model.predict(X)
+    model.decision_function(X)
+    # Single-row path, which is what /event actually exercises
+    model.decision_function(X.iloc[:1])
+
+# Per-host / per-segment models, loaded on first use and warmed up like the global one
+model_registry = ModelRegistry(on_load=warm_up)
+
+def load_model(state, path=None):
+    """Load and warm up the model artifacts into `state`. Runs in a background thread at startup."""
+    path = path or MODEL_PATH
+    state.path = path
+    state.started_at = time.perf_counter()
+    if not os.path.exists(path):
+        state.status = "missing"
+        logger.warning(f"Model file not found at {path}. Inference will not be available until the model is provided.")
+        return
 
-# Load Model Artifacts
-model_artifacts = None
-if os.path.exists(MODEL_PATH):
     try:
-        model_artifacts = joblib.load(MODEL_PATH)
-        logger.info(f"Model loaded successfully from {MODEL_PATH}")
+        state.status = "loading"
+        import joblib
+
+        artifacts = joblib.load(path)
+        state.load_seconds = time.perf_counter() - state.started_at
+        logger.info(f"Model loaded successfully from {path} in {state.load_seconds:.3f}s")
+
+        state.status = "warming"
+        warm_start = time.perf_counter()
+        warm_up(artifacts)
+        state.warmup_seconds = time.perf_counter() - warm_start
+        logger.info(f"Model warm-up completed in {state.warmup_seconds:.3f}s")
+
+        state.artifacts = artifacts
+        state.status = "ready"
+        state.ready.set()
     except Exception as e:
+        state.status = "failed"
+        state.error = str(e)
         logger.error(f"Error loading model: {e}")
-else:
-    logger.warning(f"Model file not found at {MODEL_PATH}. Inference will not be available until the model is provided.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in the background so the server accepts connections (and /ready) immediately
+    if model_state.begin_loading():
+        loader = threading.Thread(target=load_model, args=(model_state,), name="model-loader", daemon=True)
+        loader.start()
+    try:
+        model_registry.load_index()
+    except Exception as e:
+        logger.error(f"Error loading per-host model index, using the global model only: {e}")
+    try:
+        alert_store.start()
+    except Exception as e:
+        logger.error(f"Error starting alert store at {alert_store.db_path}, anomalies will only be logged: {e}")
+    yield
+    alert_store.stop()
+
+app = FastAPI(title="AIOps Network Anomaly Detection API", lifespan=lifespan)
 
 # Input Schema (Matches CSV Schema)
 class NetworkEvent(BaseModel):
@@ -68,49 +192,65 @@ class NetworkEvent(BaseModel):
 async def root():
     return {"message": "AIOps Network Anomaly Detection API is live"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 otherwise."""
+    code = status.HTTP_200_OK if model_state.ready.is_set() else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=model_state.summary())
+
 @app.post("/event")
-async def predict_event(event: NetworkEvent, api_key: str = Security(get_api_key)):
-    if not model_artifacts:
+def predict_event(event: NetworkEvent, api_key: str = Security(get_api_key)):
+    if not model_state.artifacts:
+        if model_state.status in ("pending", "loading", "warming"):
+            raise HTTPException(status_code=503, detail=f"Model is still starting up ({model_state.status}). Check /ready.")
         raise HTTPException(status_code=503, detail="Model is not loaded. Please upload anomaly_model.joblib to ml/models/")
 
+    import pandas as pd
+
     # 1. Transform input to DataFrame
     event_data = event.dict()
     df_input = pd.DataFrame([event_data])
 
     try:
+        # Route to the host/segment model if one was trained, otherwise use the global model
+        model_artifacts, model_name = model_registry.get(event.source_ip)
+        if model_artifacts is None:
+            model_artifacts, model_name = model_state.artifacts, "global"
+
         # 2. Preprocessing (Must match training code)
-        # Handle protocol encoding
-        le = model_artifacts['le_protocol']
-        # If protocol is unseen, we might need handling, but for this project we assume known protocols
-        try:
-            df_input['protocol_enc'] = le.transform(df_input['protocol'])
-        except ValueError:
-            # Simple fallback for unknown protocol
-            df_input['protocol_enc'] = -1 
-
-        # Scale numeric features
-        scaler = model_artifacts['scaler']
-        numeric_features = ['dest_port', 'bytes_sent', 'bytes_recv']
-        df_input[numeric_features] = scaler.transform(df_input[numeric_features])
+        X = preprocess(model_artifacts, df_input)
 
         # 3. Inference
         model = model_artifacts['model']
-        features = model_artifacts['features']
-        X = df_input[features]
-        
         prediction = model.predict(X)[0] # 1 for inlier, -1 for outlier
-        score = model.decision_function(X)[0]
+        score = float(model.decision_function(X)[0])
 
         # 4. Trigger Alerts
         status = "normal" if prediction == 1 else "anomaly"
         if status == "anomaly":
             logger.warning(f"ALERT: Anomaly detected! Source: {event.source_ip} -> Dest: {event.dest_ip}:{event.dest_port} | Score: {score}")
+            alert_store.record({
+                'event_timestamp': event.timestamp,
+                'source_ip': event.source_ip,
+                'dest_ip': event.dest_ip,
+                'dest_port': event.dest_port,
+                'dest_domain': event.dest_domain,
+                'protocol': event.protocol,
+                'process_path': event.process_path,
+                'process_hash': event.process_hash,
+                'parent_process': event.parent_process,
+                'user_context': event.user_context,
+                'bytes_sent': event.bytes_sent,
+                'bytes_recv': event.bytes_recv,
+                'anomaly_score': score,
+            })
         else:
             logger.info(f"Event processed: Status: {status} | Score: {score}")
 
         return {
             "status": status,
             "anomaly_score": score,
+            "model": model_name,
             "timestamp": datetime.now().isoformat(),
             "event_summary": f"{event.source_ip} -> {event.dest_ip}:{event.dest_port}"
         }
@@ -119,6 +259,65 @@ async def predict_event(event: NetworkEvent, api_key: str = Security(get_api_key
         logger.error(f"Inference error: {e}")
         raise HTTPException(status_code=500, detail="An error occurred during inference.")
 
+@app.get("/alerts")
+def list_alerts(
+    source_ip: Optional[str] = None,
+    dest_ip: Optional[str] = None,
+    dest_port: Optional[int] = None,
+    process_hash: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    api_key: str = Security(get_api_key)
+):
+    """Page through stored anomalies, newest first. Pass `next_cursor` back as `cursor` for the next page.
+
+    `start`/`end` filter on `detected_at`, the time the API scored the event, not on the
+    event's own `timestamp` (stored unindexed as `event_timestamp`, in whatever format the sender used).
+    """
+    if not alert_store.running:
+        raise HTTPException(status_code=503, detail="Alert store is not available.")
+
+    try:
+        alerts, next_cursor = alert_store.query(
+            source_ip=source_ip,
+            dest_ip=dest_ip,
+            dest_port=dest_port,
+            process_hash=process_hash,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for alert in alerts:
+        alert['detected_at'] = datetime.fromtimestamp(alert['detected_at']).isoformat()
+    return {"alerts": alerts, "count": len(alerts), "next_cursor": next_cursor}
+
+@app.get("/alerts/stats")
+def alert_stats(api_key: str = Security(get_api_key)):
+    return alert_store.stats()
+
+@app.get("/models/stats")
+def model_stats(api_key: str = Security(get_api_key)):
+    """Residency and load/eviction counters for the per-host model cache."""
+    return model_registry.stats()
+
+@app.post("/models/reload")
+def reload_models(api_key: str = Security(get_api_key)):
+    """Re-read the per-host model index after retraining; resident models are dropped and reload lazily."""
+    try:
+        model_registry.load_index()
+    except Exception as e:
+        logger.error(f"Error reloading per-host model index, using the global model only: {e}")
+        raise HTTPException(status_code=500, detail="Could not read the per-host model index.")
+    return model_registry.stats()
+
 if __name__ == "__main__":
+    # Run from the repo root with `python -m api.app` (or `uvicorn api.app:app`);
+    # `python api/app.py` can't resolve the `api` package imports.
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("api.app:app", host="0.0.0.0", port=8000)
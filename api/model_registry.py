@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from ml.model_keys import model_key
+
+logger = logging.getLogger("AIOps-API")
+
+# Per-host / per-segment model Configuration
+SEGMENT_MODELS_DIR = os.getenv("AIOPS_SEGMENT_MODELS_DIR", "ml/models/segments")
+MODEL_CACHE_SIZE = int(os.getenv("AIOPS_MODEL_CACHE_SIZE", "64"))
+MODEL_CACHE_MB = float(os.getenv("AIOPS_MODEL_CACHE_MB", "512"))
+
+# Seconds before a model that failed to load is tried again
+LOAD_RETRY_SECONDS = 60
+
+class ModelRegistry:
+    """Routes events to per-host / per-segment models produced by `ml/train.py --group-by`.
+
+    Models are loaded lazily on first use and kept in an LRU bounded by both a
+    model count and an approximate memory budget (the artifact's size on disk).
+    Events without a dedicated model return None so the caller can use the global model.
+    """
+
+    def __init__(self, models_dir=SEGMENT_MODELS_DIR, max_models=MODEL_CACHE_SIZE,
+                 max_bytes=MODEL_CACHE_MB * 1024 * 1024, on_load=None, retry_after=LOAD_RETRY_SECONDS):
+        self.models_dir = models_dir
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.on_load = on_load
+        self.retry_after = retry_after
+        self.group_by = 'host'
+        self.prefix = 24
+        self.index = {}
+        self._cache = OrderedDict()  # key -> (artifacts, size_bytes)
+        self._bytes = 0
+        self._failed = {}  # key -> monotonic time of the last failed load
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        self.load_errors = 0
+
+    def load_index(self):
+        """(Re)read the routing index written by the trainer. Missing index means global model only.
+
+        Resident models and failed-load markers are dropped, so calling this after a
+        retrain never keeps serving models from the previous run.
+        """
+        with self._lock:
+            self.index = {}
+            self._cache.clear()
+            self._bytes = 0
+            self._failed.clear()
+        path = os.path.join(self.models_dir, 'index.json')
+        if not os.path.exists(path):
+            logger.info(f"No per-host model index at {path}. All events will use the global model.")
+            return
+        with open(path) as f:
+            index = json.load(f)
+        self.group_by = index.get('group_by', 'host')
+        self.prefix = index.get('prefix', 24)
+        self.index = index.get('models', {})
+        logger.info(f"Model index loaded: {len(self.index)} {self.group_by} models available")
+
+    def get(self, source_ip):
+        """Return (artifacts, key) for the event's host/segment, or (None, None) to fall back."""
+        key = model_key(source_ip, self.group_by, self.prefix)
+        entry = self.index.get(key)
+        failed_at = self._failed.get(key)
+        if entry is None or (failed_at is not None and time.monotonic() - failed_at < self.retry_after):
+            with self._lock:
+                self.fallbacks += 1
+            return None, None
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[0], key
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so one slow load doesn't stall other hosts
+        with key_lock:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return cached[0], key
+            artifacts, size = self._load(key, entry)
+            if artifacts is None:
+                return None, None
+            with self._lock:
+                self._cache[key] = (artifacts, size)
+                self._bytes += size
+                self._evict()
+        return artifacts, key
+
+    def _load(self, key, entry):
+        import joblib
+
+        path = os.path.join(self.models_dir, entry['file'])
+        try:
+            artifacts = joblib.load(path)
+            if self.on_load:
+                self.on_load(artifacts)
+        except Exception as e:
+            logger.error(f"Error loading model for {key} from {path}: {e}")
+            with self._lock:
+                self.load_errors += 1
+                self.fallbacks += 1
+                self._failed[key] = time.monotonic()
+            return None, 0
+        with self._lock:
+            self.loads += 1
+            self._failed.pop(key, None)
+        logger.info(f"Loaded {self.group_by} model for {key} from {path}")
+        return artifacts, os.path.getsize(path)
+
+    def _evict(self):
+        # Always keep the most recently loaded model, even if it alone exceeds the budget
+        while len(self._cache) > 1 and (len(self._cache) > self.max_models or self._bytes > self.max_bytes):
+            key, (_, size) = self._cache.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            logger.info(f"Evicted {self.group_by} model for {key} from memory")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "group_by": self.group_by,
+                "available": len(self.index),
+                "resident": len(self._cache),
+                "resident_mb": round(self._bytes / (1024 * 1024), 2),
+                "max_models": self.max_models,
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "fallbacks": self.fallbacks,
+                "load_errors": self.load_errors,
+            }
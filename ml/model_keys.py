@@ -0,0 +1,16 @@
+import ipaddress
+
+# Shared by ml/train.py and the API's model registry. Keep this module free of
+# heavy dependencies: the API imports it at startup.
+
+def model_key(source_ip, group_by='host', prefix=24):
+    """Map a source IP to the key of the model that should score it."""
+    if group_by == 'host':
+        return source_ip
+    try:
+        return str(ipaddress.ip_network(f"{source_ip}/{prefix}", strict=False))
+    except ValueError:
+        return source_ip
+
+def key_filename(key):
+    return key.replace('.', '_').replace(':', '_').replace('/', '-') + '.joblib'
@@ -1,27 +1,28 @@
 import pandas as pd
 import numpy as np
 import joblib
+import json
+import argparse
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 import os
 
-# Create directories if they don't exist
-os.makedirs('ml/models', exist_ok=True)
+try:
+    from ml.model_keys import model_key, key_filename
+except ImportError:
+    # Run as a script: python ml/train.py
+    from model_keys import model_key, key_filename
+
+MODELS_DIR = 'ml/models'
+SEGMENTS_SUBDIR = 'segments'
+
+# Hosts/segments with fewer events than this fall back to the global model
+MIN_GROUP_SAMPLES = 50
+
+def fit_artifacts(df):
+    """Fit encoder, scaler and Isolation Forest on a cleaned DataFrame."""
+    df = df.copy()
 
-def train_model(data_path='data/network_traffic_data.csv'):
-    print(f"Loading data from {data_path}...")
-    df = pd.read_csv(data_path)
-    
-    # 1. Data Cleaning
-    # Remove any rows with missing values that are critical
-    df = df.dropna(subset=['source_ip', 'dest_ip', 'dest_port', 'protocol'])
-    
-    # 2. Feature Engineering
-    print("Performing feature engineering...")
-    
-    # Fill missing values for dns_query
-    df['dns_query'] = df['dns_query'].fillna('none')
-    
     # Encode categorical features
     # Using LabelEncoder for simplicity in this Phase
     le_protocol = LabelEncoder()
@@ -39,29 +40,103 @@ def train_model(data_path='data/network_traffic_data.csv'):
     features = numeric_features + ['protocol_enc']
     X = df[features]
     
-    # 3. Model Training
-    print("Training Isolation Forest model...")
     # contamination='auto' lets the model decide the proportion of outliers
     model = IsolationForest(n_estimators=100, contamination='auto', random_state=42)
     model.fit(X)
     
-    # 4. Evaluation (Simple check)
     # 1 for inliers, -1 for outliers
     predictions = model.predict(X)
     anomaly_count = (predictions == -1).sum()
-    print(f"Detected {anomaly_count} anomalies out of {len(df)} records.")
-    
-    # 5. Save Artifacts
-    print("Saving model and preprocessing artifacts...")
+
     model_artifacts = {
         'model': model,
         'scaler': scaler,
         'le_protocol': le_protocol,
         'features': features
     }
+    return model_artifacts, anomaly_count
+
+def train_model(data_path='data/network_traffic_data.csv', group_by=None, prefix=24,
+                min_samples=MIN_GROUP_SAMPLES, output_dir=MODELS_DIR, clear_groups=False):
+    # Create directories if they don't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Loading data from {data_path}...")
+    df = pd.read_csv(data_path)
     
-    joblib.dump(model_artifacts, 'ml/models/anomaly_model.joblib')
-    print("Phase 1 complete. Model saved to ml/models/anomaly_model.joblib")
+    # 1. Data Cleaning
+    # Remove any rows with missing values that are critical
+    df = df.dropna(subset=['source_ip', 'dest_ip', 'dest_port', 'protocol'])
+    
+    # 2. Feature Engineering
+    print("Performing feature engineering...")
+    
+    # Fill missing values for dns_query
+    df['dns_query'] = df['dns_query'].fillna('none')
+    
+    # 3. Model Training
+    print("Training Isolation Forest model...")
+    model_artifacts, anomaly_count = fit_artifacts(df)
+    
+    # 4. Evaluation (Simple check)
+    print(f"Detected {anomaly_count} anomalies out of {len(df)} records.")
+    
+    # 5. Save Artifacts
+    print("Saving model and preprocessing artifacts...")
+    model_path = os.path.join(output_dir, 'anomaly_model.joblib')
+    joblib.dump(model_artifacts, model_path)
+    print(f"Phase 1 complete. Model saved to {model_path}")
+
+    # Regrouping replaces the previous per-host/segment models; a plain global retrain
+    # leaves them in place unless explicitly asked to remove them
+    if group_by or clear_groups:
+        clear_group_models(output_dir)
+    if group_by:
+        train_group_models(df, group_by, prefix, min_samples, output_dir)
+
+def clear_group_models(output_dir):
+    """Remove the routing index and per-host/segment models from a previous run."""
+    segments_dir = os.path.join(output_dir, SEGMENTS_SUBDIR)
+    if not os.path.isdir(segments_dir):
+        return
+    removed = 0
+    for name in os.listdir(segments_dir):
+        if name == 'index.json' or name.endswith('.joblib'):
+            os.remove(os.path.join(segments_dir, name))
+            removed += 1
+    if removed:
+        print(f"Removed {removed} files from previous per-host/segment training in {segments_dir}")
+
+def train_group_models(df, group_by, prefix, min_samples, output_dir):
+    """Train one model per host or network segment and write an index the API uses for routing."""
+    segments_dir = os.path.join(output_dir, SEGMENTS_SUBDIR)
+    os.makedirs(segments_dir, exist_ok=True)
+
+    keys = df['source_ip'].map(lambda ip: model_key(ip, group_by, prefix))
+    index = {'group_by': group_by, 'prefix': prefix, 'models': {}}
+    for key, group in df.groupby(keys):
+        if len(group) < min_samples:
+            print(f"Skipping {key}: only {len(group)} records (< {min_samples}), will use the global model.")
+            continue
+        model_artifacts, anomaly_count = fit_artifacts(group)
+        filename = key_filename(key)
+        joblib.dump(model_artifacts, os.path.join(segments_dir, filename))
+        index['models'][key] = {'file': filename, 'samples': len(group)}
+        print(f"Trained model for {key}: {anomaly_count} anomalies out of {len(group)} records.")
+
+    with open(os.path.join(segments_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    print(f"Saved {len(index['models'])} {group_by} models to {segments_dir}")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the AIOps anomaly detection models.")
+    parser.add_argument('--data', default='data/network_traffic_data.csv')
+    parser.add_argument('--group-by', choices=['host', 'segment'], help="Also train one model per source host or per network segment")
+    parser.add_argument('--prefix', type=int, default=24, help="Segment prefix length when grouping by segment")
+    parser.add_argument('--min-samples', type=int, default=MIN_GROUP_SAMPLES)
+    parser.add_argument('--output-dir', default=MODELS_DIR)
+    parser.add_argument('--clear-group-models', action='store_true',
+                        help="Remove existing per-host/segment models so every event uses the global model")
+    args = parser.parse_args()
+    train_model(args.data, args.group_by, args.prefix, args.min_samples, args.output_dir,
+                args.clear_group_models)
@@ -23,7 +23,12 @@ else {
 # 3. Start API Server
 Write-Host "[3/6] Starting FastAPI server..." -ForegroundColor Yellow
 $ApiProcess = Start-Process python -ArgumentList "-m uvicorn api.app:app --host localhost --port 8000" -WorkingDirectory $ProjectRoot -PassThru -NoNewWindow
-Start-Sleep -Seconds 5
+# Wait for the model to be loaded and warmed up
+$Deadline = (Get-Date).AddSeconds(60)
+do {
+    Start-Sleep -Milliseconds 500
+    try { $Ready = (Invoke-WebRequest -Uri "http://localhost:8000/ready" -UseBasicParsing).StatusCode -eq 200 } catch { $Ready = $false }
+} until ($Ready -or (Get-Date) -gt $Deadline)
 
 # 4. Run Pytest
 Write-Host "[4/6] Running automated tests (pytest)..." -ForegroundColor Yellow
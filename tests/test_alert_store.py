@@ -0,0 +1,113 @@
+import sqlite3
+import time
+import pytest
+from api.alert_store import COLUMNS, AlertStore
+
+def make_alert(i, **overrides):
+    alert = {
+        "detected_at": 1700000000.0 + i,
+        "event_timestamp": "2023-10-27 10:00:00",
+        "source_ip": "192.168.1.5" if i % 2 == 0 else "192.168.1.100",
+        "dest_ip": "8.8.8.8",
+        "dest_port": 443,
+        "process_hash": "abc123hash",
+        "protocol": "TCP",
+        "bytes_sent": 500,
+        "bytes_recv": 1200,
+        "anomaly_score": -0.1,
+    }
+    alert.update(overrides)
+    return alert
+
+@pytest.fixture
+def store(tmp_path):
+    store = AlertStore(db_path=str(tmp_path / "alerts.db"), retention_days=30, batch_size=50, flush_interval=0.05)
+    store.start()
+    yield store
+    store.stop()
+
+def test_batched_writes_and_filters(store):
+    """Queued alerts are written in batches and can be filtered by each indexed field."""
+    for i in range(120):
+        store.record(make_alert(i))
+    store.flush()
+
+    assert store.stats()["written"] == 120
+    alerts, _ = store.query(source_ip="192.168.1.5", limit=1000)
+    assert len(alerts) == 60
+    assert all(a["source_ip"] == "192.168.1.5" for a in alerts)
+
+    alerts, _ = store.query(dest_ip="8.8.8.8", dest_port=443, start=1700000100.0, limit=1000)
+    assert len(alerts) == 20
+    assert store.query(process_hash="unknown")[0] == []
+
+def test_cursor_pagination(store):
+    """Pages are newest first, don't overlap and end with a null cursor."""
+    for i in range(25):
+        store.record(make_alert(i))
+    store.flush()
+
+    seen, cursor = [], None
+    while True:
+        alerts, cursor = store.query(limit=10, cursor=cursor)
+        seen.extend(a["id"] for a in alerts)
+        if cursor is None:
+            break
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    times = [a["detected_at"] for a in store.query(limit=25)[0]]
+    assert times == sorted(times, reverse=True)
+
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
+
+def test_retention_compaction(store):
+    """Alerts older than the retention window are deleted by compaction."""
+    now = time.time()
+    store.record(make_alert(0, detected_at=now - 40 * 86400))
+    store.record(make_alert(1, detected_at=now - 31 * 86400))
+    store.record(make_alert(2, detected_at=now - 1 * 86400))
+    store.flush()
+
+    assert store.compact(now=now) == 2
+    alerts, _ = store.query()
+    assert len(alerts) == 1
+    assert alerts[0]["detected_at"] == pytest.approx(now - 86400)
+
+    conn = sqlite3.connect(store.db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # INCREMENTAL
+    conn.close()
+
+def test_store_down(tmp_path):
+    """A store whose writer isn't running drops alerts and never hangs flush/stop."""
+    store = AlertStore(db_path=str(tmp_path / "alerts.db"))
+    store.record(make_alert(0))
+    assert store.stats()["dropped"] == 1
+    assert store.stats()["queued"] == 0
+    store.stop()
+
+    store.start()
+    store.stop()
+    assert not store.running
+    # Simulate alerts left behind by a writer that died
+    store._queue.put_nowait(tuple(make_alert(1).get(col) for col in COLUMNS))
+    assert store.flush() is False
+    store.stop()
+
+@pytest.mark.parametrize("filters, index", [
+    ({"dest_port": 4444}, "idx_alerts_port"),
+    ({"dest_ip": "8.8.8.8", "dest_port": 443}, "idx_alerts_dest"),
+    ({"source_ip": "192.168.1.5"}, "idx_alerts_source"),
+    ({"process_hash": "abc123hash"}, "idx_alerts_hash"),
+])
+def test_filters_use_an_index(store, filters, index):
+    """Each supported filter is served by its own index rather than a scan of the time index."""
+    where = " AND ".join(f"{col} = ?" for col in filters)
+    conn = sqlite3.connect(store.db_path)
+    plan = conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM alerts WHERE {where} ORDER BY detected_at DESC, id DESC LIMIT 10",
+        list(filters.values())
+    ).fetchall()
+    conn.close()
+    assert index in " ".join(row[-1] for row in plan)
@@ -0,0 +1,107 @@
+import time
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+import api.app as app_module
+from api.alert_store import AlertStore
+
+API_KEY = "dev-secret-key-123"
+HEADERS = {"X-API-Key": API_KEY}
+
+def test_api_starts_without_alert_store(tmp_path, monkeypatch):
+    """An unusable alert DB must not take down inference or /ready; /alerts reports 503."""
+    # A directory can't be opened as a SQLite database
+    monkeypatch.setattr(app_module, "alert_store", AlertStore(db_path=str(tmp_path)))
+
+    with TestClient(app_module.app) as client:
+        assert client.get("/ready").status_code in (200, 503)
+        assert client.get("/alerts", headers=HEADERS).status_code == 503
+        assert client.get("/alerts/stats", headers=HEADERS).json()["running"] is False
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client with the alert store isolated in tmp_path and the model ready."""
+    store = AlertStore(db_path=str(tmp_path / "alerts.db"), flush_interval=0.05)
+    monkeypatch.setattr(app_module, "alert_store", store)
+    with TestClient(app_module.app) as client:
+        deadline = time.perf_counter() + 30
+        while client.get("/ready").status_code != 200:
+            assert time.perf_counter() < deadline, "Model did not become ready in time"
+            time.sleep(0.05)
+        yield client
+
+def seed(store, count, base=1700000000.0):
+    for i in range(count):
+        store.record({
+            "detected_at": base + i * 60,
+            "source_ip": "10.0.0.5",
+            "dest_ip": "6.6.6.6",
+            "dest_port": 4444,
+            "process_hash": "deadbeef",
+            "anomaly_score": -0.2,
+        })
+    assert store.flush(timeout=5)
+
+def test_event_anomaly_is_stored(client):
+    """An anomalous /event is persisted and queryable by its source host."""
+    payload = {
+        "timestamp": "2023-10-27 10:00:00",
+        "process_path": "C:\\Users\\Public\\nc.exe",
+        "process_hash": "badhash",
+        "source_ip": "192.168.1.66",
+        "dest_ip": "6.6.6.6",
+        "dest_port": 4444,
+        "bytes_sent": 1000000000,
+        "bytes_recv": 1000000000,
+        "protocol": "TCP"
+    }
+    response = client.post("/event", json=payload, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["status"] == "anomaly"
+    assert app_module.alert_store.flush(timeout=5)
+
+    data = client.get("/alerts", params={"source_ip": "192.168.1.66"}, headers=HEADERS).json()
+    assert data["count"] == 1
+    alert = data["alerts"][0]
+    assert alert["dest_port"] == 4444
+    assert alert["process_hash"] == "badhash"
+    assert alert["event_timestamp"] == "2023-10-27 10:00:00"
+    assert alert["anomaly_score"] == pytest.approx(response.json()["anomaly_score"])
+    # detected_at is returned as an ISO datetime
+    datetime.fromisoformat(alert["detected_at"])
+
+def test_alerts_pagination_and_time_window(client):
+    """Cursors round-trip over HTTP and start/end filter on detection time."""
+    seed(app_module.alert_store, 25)
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 10, "dest_ip": "6.6.6.6", "dest_port": 4444}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/alerts", params=params, headers=HEADERS).json()
+        ids.extend(a["id"] for a in data["alerts"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert len(ids) == 25
+    assert len(set(ids)) == 25
+
+    start = datetime.fromtimestamp(1700000000.0 + 5 * 60).isoformat()
+    end = datetime.fromtimestamp(1700000000.0 + 15 * 60).isoformat()
+    data = client.get("/alerts", params={"start": start, "end": end, "process_hash": "deadbeef"}, headers=HEADERS).json()
+    assert data["count"] == 10
+    assert data["alerts"][0]["detected_at"] == datetime.fromtimestamp(1700000000.0 + 14 * 60).isoformat()
+    assert data["alerts"][-1]["detected_at"] == start
+
+def test_alerts_bad_cursor_and_auth(client):
+    assert client.get("/alerts", params={"cursor": "bad"}, headers=HEADERS).status_code == 400
+    assert client.get("/alerts").status_code == 403
+    assert client.get("/alerts/stats").status_code == 403
+
+def test_alert_stats(client):
+    seed(app_module.alert_store, 3)
+    stats = client.get("/alerts/stats", headers=HEADERS).json()
+    assert stats["running"] is True
+    assert stats["written"] == 3
+    assert stats["dropped"] == 0
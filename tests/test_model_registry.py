@@ -0,0 +1,150 @@
+import json
+import shutil
+import os
+import pandas as pd
+import pytest
+from api.model_registry import ModelRegistry
+from ml.train import train_model
+
+HOSTS = ["10.0.1.10", "10.0.1.20", "10.0.2.30"]
+
+@pytest.fixture(scope="module")
+def data_path(tmp_path_factory):
+    """Small synthetic dataset; 10.0.3.40 has too few records to get its own model."""
+    tmp = tmp_path_factory.mktemp("data")
+    rows = []
+    for h, host in enumerate(HOSTS + ["10.0.3.40"]):
+        count = 10 if host == "10.0.3.40" else 60
+        for i in range(count):
+            rows.append({
+                "timestamp": "12/6/24 10:00",
+                "process_path": "C:\\Windows\\System32\\svchost.exe",
+                "process_hash": "a1b2c3d4e5f6",
+                "source_ip": host,
+                "dest_ip": "8.8.8.8",
+                "dest_domain": "dns.google",
+                "dest_port": (53, 443)[i % 2],
+                "bytes_sent": 64 * (h + 1) + i,
+                "bytes_recv": 128 * (h + 1) + i,
+                "protocol": ("UDP", "TCP")[i % 2],
+                "dns_query": "dns.google",
+                "parent_process": "services.exe",
+                "user_context": "SYSTEM",
+            })
+    path = tmp / "traffic.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture(scope="module")
+def models_dir(tmp_path_factory, data_path):
+    tmp = tmp_path_factory.mktemp("models")
+    train_model(data_path, group_by="host", output_dir=str(tmp))
+    return str(tmp / "segments")
+
+def test_trainer_writes_index(models_dir):
+    with open(os.path.join(models_dir, "index.json")) as f:
+        index = json.load(f)
+    assert index["group_by"] == "host"
+    assert sorted(index["models"]) == HOSTS
+    for entry in index["models"].values():
+        assert os.path.exists(os.path.join(models_dir, entry["file"]))
+
+def test_lazy_load_lru_eviction_and_fallback(models_dir):
+    """Models load on first use, the least recently used is evicted, unknown hosts fall back."""
+    warmed = []
+    registry = ModelRegistry(models_dir=models_dir, max_models=2, on_load=warmed.append)
+    registry.load_index()
+    assert registry.stats()["resident"] == 0
+
+    artifacts, key = registry.get("10.0.1.10")
+    assert key == "10.0.1.10"
+    assert "model" in artifacts
+    registry.get("10.0.1.20")
+    registry.get("10.0.1.10")  # hit, makes 10.0.1.20 the LRU entry
+    registry.get("10.0.2.30")  # evicts 10.0.1.20
+
+    assert registry.get("10.0.3.40") == (None, None)  # too few samples, no model
+    assert registry.get("172.16.0.1") == (None, None)  # never seen
+
+    stats = registry.stats()
+    assert stats["loads"] == 3
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 1
+    assert stats["resident"] == 2
+    assert stats["fallbacks"] == 2
+    assert len(warmed) == 3
+
+def test_memory_budget_eviction(models_dir):
+    """The byte budget bounds residency even when the model-count limit is not reached."""
+    size = os.path.getsize(os.path.join(models_dir, "10_0_1_10.joblib"))
+    registry = ModelRegistry(models_dir=models_dir, max_models=100, max_bytes=size * 1.5)
+    registry.load_index()
+    for host in HOSTS:
+        registry.get(host)
+    assert registry.stats()["resident"] == 1
+    assert registry.stats()["evictions"] == 2
+
+def test_segment_routing(tmp_path, data_path):
+    """With segment grouping, every host in the /24 shares the trainer's segment model."""
+    train_model(data_path, group_by="segment", prefix=24, output_dir=str(tmp_path))
+
+    registry = ModelRegistry(models_dir=str(tmp_path / "segments"))
+    registry.load_index()
+    assert sorted(registry.index) == ["10.0.1.0/24", "10.0.2.0/24"]
+    artifacts, key = registry.get("10.0.1.77")
+    assert key == "10.0.1.0/24"
+    assert "model" in artifacts
+    assert registry.get("10.0.2.30")[1] == "10.0.2.0/24"
+    assert registry.get("10.0.3.40") == (None, None)  # segment too small
+
+def test_retraining_replaces_group_models(tmp_path, data_path):
+    """Regrouping removes orphaned models; a plain retrain keeps them; --clear-group-models stops per-host routing."""
+    segments_dir = tmp_path / "segments"
+    train_model(data_path, group_by="host", output_dir=str(tmp_path))
+    assert (segments_dir / "10_0_1_10.joblib").exists()
+
+    train_model(data_path, group_by="segment", output_dir=str(tmp_path))
+    assert sorted(os.listdir(segments_dir)) == ["10_0_1_0-24.joblib", "10_0_2_0-24.joblib", "index.json"]
+
+    train_model(data_path, output_dir=str(tmp_path))
+    assert len(os.listdir(segments_dir)) == 3
+
+    train_model(data_path, output_dir=str(tmp_path), clear_groups=True)
+    assert os.listdir(segments_dir) == []
+    registry = ModelRegistry(models_dir=str(segments_dir))
+    registry.load_index()
+    assert registry.get("10.0.1.10") == (None, None)
+    assert registry.stats()["available"] == 0
+
+def test_failed_load_is_retried_after_backoff(tmp_path, models_dir):
+    """A model that fails to load falls back to global, then is retried once the backoff expires."""
+    with open(os.path.join(models_dir, "index.json")) as f:
+        index = json.load(f)
+    entry = index["models"]["10.0.1.10"]
+    with open(tmp_path / "index.json", "w") as f:
+        json.dump({"group_by": "host", "models": {"10.0.1.10": entry}}, f)
+    (tmp_path / entry["file"]).write_bytes(b"not a model")
+
+    registry = ModelRegistry(models_dir=str(tmp_path), retry_after=3600)
+    registry.load_index()
+    assert registry.get("10.0.1.10") == (None, None)
+    assert registry.get("10.0.1.10") == (None, None)  # within the backoff, not retried
+    assert registry.stats()["load_errors"] == 1
+
+    shutil.copy(os.path.join(models_dir, entry["file"]), tmp_path / entry["file"])
+    registry.retry_after = 0
+    assert registry.get("10.0.1.10")[1] == "10.0.1.10"
+    assert registry.stats()["load_errors"] == 1
+
+def test_reload_index_drops_resident_models(tmp_path, data_path):
+    """Reloading after a retrain serves the new index, not models cached from the old one."""
+    train_model(data_path, group_by="host", output_dir=str(tmp_path))
+    registry = ModelRegistry(models_dir=str(tmp_path / "segments"))
+    registry.load_index()
+    assert registry.get("10.0.1.10")[1] == "10.0.1.10"
+
+    train_model(data_path, group_by="segment", output_dir=str(tmp_path))
+    registry.load_index()
+    assert registry.stats()["resident"] == 0
+    assert registry.stats()["resident_mb"] == 0
+    assert registry.get("10.0.1.10")[1] == "10.0.1.0/24"
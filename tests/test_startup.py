@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+# Cold-start budgets (seconds), measured in a fresh interpreter. Locally the import
+# takes ~0.35s and the first successful prediction lands ~2.0s after process start
+# (joblib/sklearn import + model load ~1.4s, warm-up ~0.1s); budgets allow ~2x headroom.
+IMPORT_TIME_BUDGET = 1.0
+FIRST_PREDICTION_BUDGET = 4.0
+
+API_KEY = "dev-secret-key-123"
+HEADERS = {"X-API-Key": API_KEY}
+
+PAYLOAD = {
+    "timestamp": "2023-10-27 10:00:00",
+    "process_path": "C:\\Windows\\System32\\svchost.exe",
+    "process_hash": "abc123hash",
+    "source_ip": "192.168.1.5",
+    "dest_ip": "8.8.8.8",
+    "dest_domain": "google.com",
+    "dest_port": 443,
+    "bytes_sent": 500,
+    "bytes_recv": 1200,
+    "protocol": "TCP",
+    "dns_query": "google.com",
+    "parent_process": "services.exe",
+    "user_context": "SYSTEM"
+}
+
+def run_fresh(code, tmp_path):
+    """Run `code` in a new interpreter so nothing is already imported or loaded."""
+    env = dict(os.environ, AIOPS_ALERT_DB=str(tmp_path / "alerts.db"))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.splitlines()
+
+def test_import_is_lightweight(tmp_path):
+    """Importing the API must not pull in heavy ML libraries or load the model."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import api.app\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('pandas', 'sklearn', 'joblib') if m in sys.modules]\n"
+        "print(elapsed)\n"
+        "print(','.join(heavy))\n"
+        "print(api.app.model_state.status)\n"
+    )
+    elapsed, heavy, model_status = run_fresh(code, tmp_path)[-3:]
+    print(f"api.app import time: {float(elapsed):.3f}s")
+    assert heavy == ""
+    assert model_status == "pending"
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+
+def test_time_to_first_prediction(tmp_path):
+    """Cold start: the server reports ready only after warm-up, and the first prediction then succeeds."""
+    code = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "from fastapi.testclient import TestClient\n"
+        "import api.app\n"
+        "with TestClient(api.app.app) as client:\n"
+        "    first = client.get('/ready').json()\n"
+        "    while client.get('/ready').status_code != 200:\n"
+        "        assert time.perf_counter() - start < 60, 'Model did not become ready'\n"
+        "        time.sleep(0.01)\n"
+        "    ready = client.get('/ready').json()\n"
+        f"    response = client.post('/event', json={PAYLOAD!r}, headers={HEADERS!r})\n"
+        "    total = time.perf_counter() - start\n"
+        "print(json.dumps({'first_status': first['status'], 'ready': ready, 'code': response.status_code,\n"
+        "                  'result': response.json().get('status'), 'total': total}))\n"
+    )
+    result = json.loads(run_fresh(code, tmp_path)[-1])
+
+    # /ready answers immediately, before the model is loaded
+    assert result["first_status"] in ("loading", "warming")
+    assert result["ready"]["status"] == "ready"
+    assert result["code"] == 200
+    assert result["result"] in ["normal", "anomaly"]
+
+    print(f"Model load: {result['ready']['load_seconds']:.3f}s | "
+          f"warm-up: {result['ready']['warmup_seconds']:.3f}s | "
+          f"time to first successful prediction: {result['total']:.3f}s")
+    assert result["total"] < FIRST_PREDICTION_BUDGET